@@ -4,19 +4,32 @@ Includes user authentication, role-based access control, and prediction history
 """
 
 # Import necessary libraries
-from flask import Flask, render_template, request, jsonify, redirect, url_for, session, flash
-from werkzeug.security import check_password_hash, generate_password_hash
-import pickle
+from flask import (
+    Flask, Response, render_template, request, redirect, url_for,
+    session, flash, after_this_request
+)
+import joblib
+import orjson
+import hashlib
+import hmac
+import math
 import numpy as np
 import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from functools import wraps
 from datetime import datetime
 
+from fast_inference import make_predict_proba
+
 # Import database functions
 from database import (
     init_db, get_db_connection, create_user, get_user_by_username,
-    save_prediction, get_all_users, get_all_reports, get_user_reports,
-    delete_user, delete_report
+    save_prediction, get_all_users, get_user_reports,
+    delete_user, delete_report, get_reports_page, get_report_stats,
+    verify_password, password_needs_rehash, hash_password, update_password_hash
 )
 
 # Initialize Flask application
@@ -29,20 +42,26 @@ init_db()
 # Load the trained model and scaler
 print("Loading model and scaler...")
 try:
-    # Load the saved model
-    with open('model.pkl', 'rb') as model_file:
-        model = pickle.load(model_file)
-    print("✓ Model loaded successfully!")
+    # Load the saved model. The uncompressed joblib copy (written by model.py
+    # and convert_model.py) is memory-mapped, so forked workers share its
+    # arrays. It is skipped when older than model.pkl, so a stale copy is
+    # never paired with a newer scaler; compressed model.pkl cannot be mmapped.
+    if (os.path.exists('model.joblib')
+            and os.path.getmtime('model.joblib') >= os.path.getmtime('model.pkl')):
+        model_path = 'model.joblib'
+        model = joblib.load(model_path, mmap_mode='r')
+    else:
+        model_path = 'model.pkl'
+        model = joblib.load(model_path)
+    print(f"✓ Model loaded successfully from '{model_path}'!")
     
     # Load the saved scaler
-    with open('scaler.pkl', 'rb') as scaler_file:
-        scaler = pickle.load(scaler_file)
+    scaler = joblib.load('scaler.pkl')
     print("✓ Scaler loaded successfully!")
     
     # Load model metadata (optional)
     try:
-        with open('model_metadata.pkl', 'rb') as meta_file:
-            metadata = pickle.load(meta_file)
+        metadata = joblib.load('model_metadata.pkl')
         print(f"✓ Model: {metadata['model_name']} (Accuracy: {metadata['accuracy']*100:.2f}%)")
     except:
         print("⚠ Model metadata not found")
@@ -55,6 +74,164 @@ except FileNotFoundError:
     print("="*60)
     exit()
 
+# Closed-form scoring for logistic regression, compiled scoring for random
+# forests (falls back to model.predict_proba)
+predict_proba = make_predict_proba(model)
+
+# ==================== PREDICTION BATCHING ====================
+
+# Input features in the order the model was trained on
+FEATURE_KEYS = (
+    'pregnancies', 'glucose', 'blood_pressure', 'skin_thickness',
+    'insulin', 'bmi', 'diabetes_pedigree_function', 'age'
+)
+
+# Concurrent /api/predict calls are queued and scored together, so the
+# scaler/model call overhead is paid once per batch instead of once per request.
+BATCH_SIZE = int(os.environ.get('BATCH_SIZE', 32))
+BATCH_TIMEOUT = float(os.environ.get('BATCH_TIMEOUT', 0.01))  # seconds
+PREDICT_TIMEOUT = float(os.environ.get('PREDICT_TIMEOUT', 5))  # seconds
+PREDICT_TIMEOUT_MESSAGE = 'The prediction service is busy, please try again shortly.'
+
+# Shared pool that runs all model inference. Its long-lived threads keep
+# their float32 buffers across requests, unlike per-request server threads.
+EXECUTOR = ThreadPoolExecutor(max_workers=os.cpu_count() or 1, thread_name_prefix='predict')
+
+_predict_queue = queue.Queue()
+_workers = {}
+_workers_lock = threading.Lock()
+
+_local = threading.local()
+
+def _feature_buffer():
+    """
+    Return this thread's preallocated (BATCH_SIZE, 8) float32 input buffer.
+    """
+    buf = getattr(_local, 'buf', None)
+    if buf is None:
+        buf = _local.buf = np.empty((BATCH_SIZE, 8), dtype=np.float32)
+    return buf
+
+def _make_row_scaler(mean, scale):
+    """
+    Generate a straight-line function that standardizes one row of feature
+    values into row i of a buffer, with the scaler's mean_ and scale_ baked
+    in as constants. This skips scaler.transform's validation and copies;
+    the arithmetic is done in float64 like StandardScaler before the result
+    is stored in the float32 buffer.
+    """
+    lines = ['def scale_row(x, out, i):']
+    for j, (m, sd) in enumerate(zip(mean, scale)):
+        lines.append(f'    out[i, {j}] = (x[{j}] - {float(m)!r}) / {float(sd)!r}')
+    namespace = {}
+    exec('\n'.join(lines), namespace)
+    return namespace['scale_row']
+
+_scale_row = _make_row_scaler(scaler.mean_, scaler.scale_)
+
+def _score_rows(rows):
+    """
+    Scale and score up to BATCH_SIZE rows using this thread's buffer.
+    
+    Args:
+        rows (list): Rows of 8 feature values, in FEATURE_KEYS order
+    
+    Returns:
+        numpy.ndarray: (len(rows), 2) array of class probabilities
+    """
+    features = _feature_buffer()[:len(rows)]
+    for i, row in enumerate(rows):
+        _scale_row(row, features, i)
+    return predict_proba(features)
+
+def _score_batch(batch):
+    """
+    Score a batch of queued requests and resolve their futures.
+    """
+    try:
+        probabilities = _score_rows([features for features, _ in batch])
+    except Exception as e:
+        for _, future in batch:
+            future.set_exception(e)
+        return
+    for (_, future), prediction_proba in zip(batch, probabilities):
+        future.set_result(prediction_proba)
+
+def _start_worker(name, target):
+    """
+    Start a daemon worker thread unless it is already running.
+    Safe to call repeatedly; it also restarts workers that did not
+    survive a fork (e.g. when the app is preloaded by a WSGI server).
+    """
+    with _workers_lock:
+        worker = _workers.get(name)
+        if worker is None or not worker.is_alive():
+            worker = threading.Thread(target=target, name=name, daemon=True)
+            worker.start()
+            _workers[name] = worker
+
+def _prediction_worker():
+    """
+    Drain the prediction queue in batches.
+    Blocks for the first request, then keeps collecting for up to
+    BATCH_TIMEOUT seconds (or BATCH_SIZE rows) and hands each batch
+    to the executor, so the next batch is collected while it is scored.
+    """
+    while True:
+        batch = [_predict_queue.get()]
+        deadline = time.monotonic() + BATCH_TIMEOUT
+        while len(batch) < BATCH_SIZE:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(_predict_queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        EXECUTOR.submit(_score_batch, batch)
+
+def _check_finite(features):
+    """
+    Raise ValueError unless every feature value is a finite number.
+    """
+    if not all(math.isfinite(value) for value in features):
+        raise ValueError('All input values must be finite numbers')
+
+def predict_batched(features):
+    """
+    Score one row through the batching queue and wait for the result.
+    
+    Args:
+        features (list): 8 feature values, in FEATURE_KEYS order
+    
+    Returns:
+        numpy.ndarray: [P(no diabetes), P(diabetes)]
+    """
+    # Validated here so one bad request cannot fail the whole batch it is scored with
+    _check_finite(features)
+    
+    _start_worker('prediction-batcher', _prediction_worker)
+    future = Future()
+    _predict_queue.put((features, future))
+    return future.result(timeout=PREDICT_TIMEOUT)
+
+def _reset_after_fork():
+    """
+    Give a forked worker process its own batching state.
+    A thread blocked on the parent's queue leaves a stale waiter behind
+    in the child that would swallow the first notification, so the queue,
+    lock and pool are recreated here rather than inherited.
+    """
+    global _predict_queue, _workers_lock, EXECUTOR
+    _predict_queue = queue.Queue()
+    _workers.clear()
+    _workers_lock = threading.Lock()
+    EXECUTOR = ThreadPoolExecutor(max_workers=os.cpu_count() or 1, thread_name_prefix='predict')
+
+# Forking (gunicorn's pre-fork workers) only exists on Unix
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
 # ==================== DECORATORS ====================
 
 def login_required(f):
@@ -86,8 +263,73 @@ def admin_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+# ==================== STATIC PAGES ====================
+
+# Rendered HTML of pages that look the same for every visitor without a
+# session (no logged-in user and no pending flash messages)
+_static_pages = {}
+
+def render_static_page(template_name):
+    """
+    Render a page that does not depend on the request.
+    For visitors with an empty session the rendered bytes are cached and
+    reused; otherwise the template is rendered normally.
+    """
+    if session:
+        return render_template(template_name)
+    html = _static_pages.get(template_name)
+    if html is None:
+        html = _static_pages[template_name] = render_template(template_name).encode()
+    return Response(html, mimetype='text/html')
+
 # ==================== AUTHENTICATION ROUTES ====================
 
+# Recent successful logins, so a repeated correct login within the TTL
+# skips the deliberately slow password hash. Keys are BLAKE2b digests of
+# the credentials under a per-process random key; failures are never cached.
+LOGIN_CACHE_TTL = 60  # seconds
+LOGIN_CACHE_MAX_ENTRIES = 4096
+_login_cache_key = os.urandom(32)
+_login_cache = {}
+_login_cache_lock = threading.Lock()
+
+def check_login(user, username, password):
+    """
+    Verify a user's password, reusing a recent successful verification.
+    A cached success is only trusted while the user's stored hash is unchanged.
+    Legacy or outdated hashes are upgraded after a successful check.
+    
+    Args:
+        user: User row from the database
+        username (str): Username entered at login
+        password (str): Password entered at login
+    
+    Returns:
+        bool: True if the password is correct
+    """
+    key = hashlib.blake2b(f'{username}\0{password}'.encode(), key=_login_cache_key).digest()
+    now = time.monotonic()
+    with _login_cache_lock:
+        entry = _login_cache.get(key)
+    if entry is not None and entry[1] > now and hmac.compare_digest(entry[0], user['password_hash']):
+        return True
+    
+    password_hash = user['password_hash']
+    if not verify_password(password_hash, password):
+        return False
+    if password_needs_rehash(password_hash):
+        password_hash = hash_password(password)
+        update_password_hash(user['id'], password_hash)
+    
+    with _login_cache_lock:
+        if len(_login_cache) >= LOGIN_CACHE_MAX_ENTRIES:
+            for expired in [k for k, (_, expiry) in _login_cache.items() if expiry <= now]:
+                del _login_cache[expired]
+            if len(_login_cache) >= LOGIN_CACHE_MAX_ENTRIES:
+                _login_cache.clear()
+        _login_cache[key] = (password_hash, now + LOGIN_CACHE_TTL)
+    return True
+
 @app.route('/')
 def index():
     """
@@ -133,7 +375,7 @@ def register():
             flash('Username or email already exists!', 'danger')
             return render_template('register.html')
     
-    return render_template('register.html')
+    return render_static_page('register.html')
 
 @app.route('/login', methods=['GET', 'POST'])
 def login():
@@ -156,7 +398,7 @@ def login():
         # Check credentials
         user = get_user_by_username(username)
         
-        if user and check_password_hash(user['password_hash'], password):
+        if user and check_login(user, username, password):
             # Set session variables
             session['user_id'] = user['id']
             session['username'] = user['username']
@@ -174,7 +416,7 @@ def login():
             flash('Invalid username or password!', 'danger')
             return render_template('login.html')
     
-    return render_template('login.html')
+    return render_static_page('login.html')
 
 @app.route('/logout')
 def logout():
@@ -198,12 +440,9 @@ def dashboard():
     # Get user's prediction history
     user_reports = get_user_reports(session['user_id'])
     
-    # Convert Row objects to dictionaries
-    reports_list = [dict(report) for report in user_reports]
-    
     return render_template('dashboard.html', 
                           username=session['username'],
-                          reports=reports_list)
+                          reports=user_reports)
 
 @app.route('/predict', methods=['POST'])
 @login_required
@@ -225,78 +464,75 @@ def predict():
             'age': int(request.form.get('age'))
         }
         
-        # Prepare data for prediction
-        features = np.array([[
-            input_data['pregnancies'],
-            input_data['glucose'],
-            input_data['blood_pressure'],
-            input_data['skin_thickness'],
-            input_data['insulin'],
-            input_data['bmi'],
-            input_data['diabetes_pedigree_function'],
-            input_data['age']
-        ]])
-        
-        # Scale the features
-        features_scaled = scaler.transform(features)
-        
-        # Make prediction
-        prediction = model.predict(features_scaled)[0]
-        prediction_proba = model.predict_proba(features_scaled)[0]
+        # Make prediction on the shared inference pool (a single predict_proba
+        # call; the class is the more probable one, with ties going to class 0
+        # like model.predict)
+        features = [input_data[key] for key in FEATURE_KEYS]
+        _check_finite(features)
+        prediction_proba = EXECUTOR.submit(_score_rows, [features]).result(timeout=PREDICT_TIMEOUT)[0]
+        prediction = int(prediction_proba[1] > 0.5)
         
         # Interpret results
         result = "Diabetes Detected" if prediction == 1 else "No Diabetes"
-        probability = float(max(prediction_proba) * 100)
+        probability = float(prediction_proba[prediction] * 100)
         
-        # Save prediction to database
-        save_prediction(
-            user_id=session['user_id'],
-            username=session['username'],
-            input_data=input_data,
-            prediction_result=result,
-            probability=probability
-        )
+        # Save prediction to database once the response has been built
+        # (queued for the background writer, off the request's critical path)
+        user_id = session['user_id']
+        username = session['username']
+        
+        @after_this_request
+        def save_report(response):
+            save_prediction(
+                user_id=user_id,
+                username=username,
+                input_data=input_data,
+                prediction_result=result,
+                probability=probability
+            )
+            return response
         
         flash(f'Prediction completed: {result} (Confidence: {probability:.2f}%)', 'success')
         return redirect(url_for('dashboard'))
         
+    except FutureTimeoutError:
+        flash(PREDICT_TIMEOUT_MESSAGE, 'danger')
+        return redirect(url_for('dashboard'))
     except Exception as e:
         flash(f'Error making prediction: {str(e)}', 'danger')
         return redirect(url_for('dashboard'))
 
 # ==================== ADMIN DASHBOARD ROUTES ====================
 
+# Number of reports listed per page on the admin dashboard
+ADMIN_REPORTS_PER_PAGE = 50
+
 @app.route('/admin/dashboard')
 @admin_required
 def admin_dashboard():
     """
     Admin dashboard page.
-    Shows all users and all prediction reports.
+    Shows all users and one page of prediction reports (?page=N).
     """
     users = get_all_users()
-    reports = get_all_reports()
     
-    # Convert Row objects to dictionaries for JSON serialization
-    users_list = [dict(user) for user in users]
-    reports_list = [dict(report) for report in reports]
+    # Statistics are aggregated in SQL rather than over every report here
+    stats = get_report_stats()
     
-    # Calculate statistics
-    total_users = len(users_list)
-    total_reports = len(reports_list)
-    diabetes_cases = sum(1 for r in reports_list if 'Diabetes Detected' in r['prediction_result'])
-    
-    stats = {
-        'total_users': total_users,
-        'total_reports': total_reports,
-        'diabetes_cases': diabetes_cases,
-        'normal_cases': total_reports - diabetes_cases
-    }
+    # Only the requested page of reports is fetched and rendered
+    total_pages = max(1, math.ceil(stats['total_reports'] / ADMIN_REPORTS_PER_PAGE))
+    page = min(max(request.args.get('page', 1, type=int), 1), total_pages)
+    reports = get_reports_page(offset=(page - 1) * ADMIN_REPORTS_PER_PAGE,
+                               limit=ADMIN_REPORTS_PER_PAGE)
     
     return render_template('admin_dashboard.html',
                           username=session['username'],
-                          users=users_list,
-                          reports=reports_list,
-                          stats=stats)
+                          users=users,
+                          reports=reports,
+                          stats=stats,
+                          page=page,
+                          total_pages=total_pages,
+                          active_tab='reports' if 'page' in request.args else 'users')
 
 @app.route('/admin/delete_user/<int:user_id>', methods=['POST'])
 @admin_required
@@ -329,6 +565,12 @@ def admin_delete_report(report_id):
 
 # ==================== API ROUTES (Optional - for AJAX) ====================
 
+def json_response(payload, status=200):
+    """
+    Build a JSON response, serialized with orjson rather than the stdlib json module.
+    """
+    return Response(orjson.dumps(payload), status=status, mimetype='application/json')
+
 @app.route('/api/predict', methods=['POST'])
 @login_required
 def api_predict():
@@ -337,29 +579,17 @@ def api_predict():
     Returns JSON response.
     """
     try:
-        data = request.get_json()
+        data = orjson.loads(request.get_data())
         
-        # Prepare data for prediction
-        features = np.array([[
-            data['pregnancies'],
-            data['glucose'],
-            data['blood_pressure'],
-            data['skin_thickness'],
-            data['insulin'],
-            data['bmi'],
-            data['diabetes_pedigree_function'],
-            data['age']
-        ]])
-        
-        # Scale and predict
-        features_scaled = scaler.transform(features)
-        prediction = model.predict(features_scaled)[0]
-        prediction_proba = model.predict_proba(features_scaled)[0]
+        # Prepare data for prediction and score it with other concurrent requests
+        features = [float(data[key]) for key in FEATURE_KEYS]
+        prediction_proba = predict_batched(features)
+        prediction = int(prediction_proba[1] > 0.5)
         
         result = "Diabetes Detected" if prediction == 1 else "No Diabetes"
-        probability = float(max(prediction_proba) * 100)
+        probability = float(prediction_proba[prediction] * 100)
         
-        # Save to database
+        # Save to database (queued for the background writer)
         save_prediction(
             user_id=session['user_id'],
             username=session['username'],
@@ -368,29 +598,35 @@ def api_predict():
             probability=probability
         )
         
-        return jsonify({
+        return json_response({
             'success': True,
             'result': result,
             'probability': probability
         })
         
+    except FutureTimeoutError:
+        # Scoring did not finish in time: a server-side condition, not a bad request
+        return json_response({
+            'success': False,
+            'error': PREDICT_TIMEOUT_MESSAGE
+        }, 503)
     except Exception as e:
-        return jsonify({
+        return json_response({
             'success': False,
             'error': str(e)
-        }), 400
+        }, 400)
 
 # ==================== ERROR HANDLERS ====================
 
 @app.errorhandler(404)
 def page_not_found(e):
     """Handle 404 errors"""
-    return render_template('404.html'), 404
+    return render_static_page('404.html'), 404
 
 @app.errorhandler(500)
 def internal_server_error(e):
     """Handle 500 errors"""
-    return render_template('500.html'), 500
+    return render_static_page('500.html'), 500
 
 # ==================== RUN APPLICATION ====================
 
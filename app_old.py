@@ -6,7 +6,7 @@ for users to input patient data and get diabetes predictions.
 
 # Import necessary libraries
 from flask import Flask, render_template, request, jsonify
-import pickle
+import joblib
 import numpy as np
 import os
 
@@ -17,19 +17,16 @@ app = Flask(__name__)
 print("Loading model and scaler...")
 try:
     # Load the saved model
-    with open('model.pkl', 'rb') as model_file:
-        model = pickle.load(model_file)
+    model = joblib.load('model.pkl')
     print("✓ Model loaded successfully!")
     
     # Load the saved scaler
-    with open('scaler.pkl', 'rb') as scaler_file:
-        scaler = pickle.load(scaler_file)
+    scaler = joblib.load('scaler.pkl')
     print("✓ Scaler loaded successfully!")
     
     # Load model metadata (optional)
     try:
-        with open('model_metadata.pkl', 'rb') as meta_file:
-            metadata = pickle.load(meta_file)
+        metadata = joblib.load('model_metadata.pkl')
         print(f"✓ Model: {metadata['model_name']} (Accuracy: {metadata['accuracy']*100:.2f}%)")
     except:
         print("⚠ Model metadata not found")
@@ -139,15 +136,15 @@ def api_predict():
         features_scaled = scaler.transform(features)
         
         # Make prediction
-        prediction = model.predict(features_scaled)[0]
         prediction_proba = model.predict_proba(features_scaled)[0]
+        prediction = 1 if prediction_proba[1] > 0.5 else 0
         
         # Prepare response
         response = {
             'prediction': int(prediction),
             'result': 'Diabetes Positive' if prediction == 1 else 'Diabetes Negative',
             'probability': float(prediction_proba[1] * 100),
-            'confidence': float(max(prediction_proba) * 100)
+            'confidence': float(prediction_proba[prediction] * 100)
         }
         
         return jsonify(response)
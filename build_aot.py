@@ -0,0 +1,26 @@
+"""
+Ahead-of-Time Compilation Script
+Compiles the inference kernels from fast_inference.py into the `_diabetes_fast`
+extension module, so the web application does not pay Numba's JIT compilation
+cost when it starts. Run once after installing the requirements:
+
+    python build_aot.py
+
+fast_inference.py imports the extension automatically when it is present.
+"""
+
+from numba.pycc import CC
+
+from fast_inference import (
+    _forest_proba, _scale_rows,
+    FOREST_PROBA_SIGNATURE, SCALE_ROWS_SIGNATURE
+)
+
+cc = CC('_diabetes_fast')
+cc.export('forest_proba', FOREST_PROBA_SIGNATURE)(_forest_proba)
+cc.export('scale_rows', SCALE_ROWS_SIGNATURE)(_scale_rows)
+
+if __name__ == '__main__':
+    print("Compiling _diabetes_fast extension...")
+    cc.compile()
+    print("✓ _diabetes_fast compiled successfully!")
@@ -0,0 +1,16 @@
+"""
+Model Conversion Script
+Re-saves the trained model from 'model.pkl' as an uncompressed joblib file,
+'model.joblib'. The web application memory-maps the NumPy arrays in that file
+instead of copying them into each worker process, so every worker shares one
+file-backed copy of the model.
+"""
+
+import joblib
+
+print("Loading model from 'model.pkl'...")
+model = joblib.load('model.pkl')
+
+# compress=0 keeps the arrays as raw blocks that can be memory-mapped
+joblib.dump(model, 'model.joblib', compress=0)
+print("✓ Model saved as 'model.joblib'")
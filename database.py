@@ -3,19 +3,81 @@ Database Initialization and Management Module
 This module handles SQLite database creation and schema setup for the diabetes prediction application.
 """
 
+import os
 import sqlite3
-from werkzeug.security import generate_password_hash
+import queue
+import threading
+import time
+from collections import OrderedDict
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
+from werkzeug.security import check_password_hash
 from datetime import datetime
 
+DATABASE_PATH = 'database.db'
+
+# Per-connection settings: WAL lets readers run alongside the writer, and
+# synchronous=NORMAL only syncs at checkpoints instead of on every commit
+CONNECTION_PRAGMAS = (
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA mmap_size=268435456',
+    'PRAGMA cache_size=-20000',
+)
+
+# Argon2id for new password hashes; older werkzeug (pbkdf2) hashes are
+# still accepted and upgraded on the next successful login
+password_hasher = PasswordHasher(time_cost=2, memory_cost=65536, parallelism=2)
+
+# One cached connection per thread
+_local = threading.local()
+
+# Write-behind queue for prediction reports; a background thread inserts
+# them in batches so many reports share one transaction commit
+WRITE_BATCH_SIZE = 256
+WRITE_BATCH_TIMEOUT = 0.05  # seconds, for the whole batch
+
+INSERT_REPORT_SQL = '''
+    INSERT INTO reports (
+        user_id, username, pregnancies, glucose, blood_pressure,
+        skin_thickness, insulin, bmi, diabetes_pedigree_function,
+        age, prediction_result, probability, is_diabetic
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+_write_queue = queue.Queue()
+_writer = None
+_writer_lock = threading.Lock()
+
+# Every queued report gets the next sequence number, and the writer records
+# the last one it has finished with, so a reader only waits for the reports
+# queued before it and not for ones that keep arriving afterwards
+_queued_seq = 0
+_written_seq = 0
+_write_done = threading.Condition()
+
+# Report lists already converted to dicts, keyed by user_id and kept in LRU
+# order (at most REPORTS_CACHE_SIZE users). Each entry stores the
+# (COUNT(*), MAX(id)) of the matching reports so changes made by other
+# processes are detected too.
+REPORTS_CACHE_SIZE = 256
+_reports_cache = OrderedDict()
+_reports_cache_lock = threading.Lock()
+
 def init_db():
     """
     Initialize the SQLite database with required tables.
     Creates users and reports tables if they don't exist.
     Also creates a default admin account.
     """
-    conn = sqlite3.connect('database.db')
+    conn = sqlite3.connect(DATABASE_PATH)
     cursor = conn.cursor()
     
+    # WAL mode is persistent, so it only needs to be set once per database file
+    cursor.execute('PRAGMA journal_mode=WAL')
+    for pragma in CONNECTION_PRAGMAS:
+        cursor.execute(pragma)
+    
     # Create users table
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS users (
@@ -44,18 +106,37 @@ def init_db():
             age INTEGER,
             prediction_result TEXT NOT NULL,
             probability REAL NOT NULL,
+            is_diabetic INTEGER NOT NULL DEFAULT 0,
             timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             FOREIGN KEY (user_id) REFERENCES users (id)
         )
     ''')
-    
+
+    # Databases created before the is_diabetic column existed get it added
+    # and filled in from the stored prediction text
+    columns = [row[1] for row in cursor.execute('PRAGMA table_info(reports)')]
+    if 'is_diabetic' not in columns:
+        cursor.execute('ALTER TABLE reports ADD COLUMN is_diabetic INTEGER NOT NULL DEFAULT 0')
+        cursor.execute("UPDATE reports SET is_diabetic = 1 WHERE prediction_result LIKE 'Diabetes Detected%'")
+
+    # Indexes for the dashboard queries (per-user history and the admin
+    # report list are both ordered by newest first)
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_reports_user_time
+        ON reports (user_id, timestamp DESC)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_reports_timestamp
+        ON reports (timestamp DESC)
+    ''')
+
     # Check if admin exists, if not create default admin
     cursor.execute("SELECT * FROM users WHERE username = 'admin'")
     admin = cursor.fetchone()
     
     if not admin:
         # Create default admin account
-        admin_password = generate_password_hash('admin123')
+        admin_password = hash_password('admin123')
         cursor.execute('''
             INSERT INTO users (username, email, password_hash, role)
             VALUES (?, ?, ?, ?)
@@ -71,13 +152,76 @@ def init_db():
 
 def get_db_connection():
     """
-    Create and return a database connection.
-    Returns a connection with row factory set to sqlite3.Row for dict-like access.
+    Return the calling thread's database connection, creating it on first use.
+    The connection runs in autocommit mode with row factory set to sqlite3.Row
+    for dict-like access. It is reused for the lifetime of the thread, so
+    callers must not close it.
     """
-    conn = sqlite3.connect('database.db')
-    conn.row_factory = sqlite3.Row
+    conn = getattr(_local, 'conn', None)
+    if conn is None:
+        conn = sqlite3.connect(DATABASE_PATH, check_same_thread=False, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        _local.conn = conn
     return conn
 
+def hash_password(password):
+    """
+    Hash a plain text password with Argon2id.
+    
+    Args:
+        password (str): Plain text password
+    
+    Returns:
+        str: Encoded password hash
+    """
+    return password_hasher.hash(password)
+
+def verify_password(password_hash, password):
+    """
+    Check a plain text password against a stored hash.
+    Accepts both Argon2 hashes and legacy werkzeug hashes.
+    
+    Args:
+        password_hash (str): Stored password hash
+        password (str): Plain text password to check
+    
+    Returns:
+        bool: True if the password matches
+    """
+    if password_hash.startswith('$argon2'):
+        try:
+            return password_hasher.verify(password_hash, password)
+        except (VerificationError, InvalidHashError):
+            return False
+    return check_password_hash(password_hash, password)
+
+def password_needs_rehash(password_hash):
+    """
+    Check whether a stored hash should be replaced with one using the current parameters.
+    
+    Args:
+        password_hash (str): Stored password hash
+    
+    Returns:
+        bool: True for legacy hashes or Argon2 hashes with outdated parameters
+    """
+    if not password_hash.startswith('$argon2'):
+        return True
+    return password_hasher.check_needs_rehash(password_hash)
+
+def update_password_hash(user_id, password_hash):
+    """
+    Replace a user's stored password hash.
+    
+    Args:
+        user_id (int): User ID
+        password_hash (str): New password hash
+    """
+    conn = get_db_connection()
+    conn.execute('UPDATE users SET password_hash = ? WHERE id = ?', (password_hash, user_id))
+
 def create_user(username, email, password, role='user'):
     """
     Create a new user in the database.
@@ -95,14 +239,11 @@ def create_user(username, email, password, role='user'):
         conn = get_db_connection()
         cursor = conn.cursor()
         
-        password_hash = generate_password_hash(password)
+        password_hash = hash_password(password)
         cursor.execute('''
             INSERT INTO users (username, email, password_hash, role)
             VALUES (?, ?, ?, ?)
         ''', (username, email, password_hash, role))
-        
-        conn.commit()
-        conn.close()
         return True
     except sqlite3.IntegrityError:
         return False
@@ -119,12 +260,130 @@ def get_user_by_username(username):
     """
     conn = get_db_connection()
     user = conn.execute('SELECT * FROM users WHERE username = ?', (username,)).fetchone()
-    conn.close()
     return user
 
+def _invalidate_reports(*user_ids):
+    """
+    Drop cached report lists for the given users.
+    """
+    with _reports_cache_lock:
+        for user_id in user_ids:
+            _reports_cache.pop(user_id, None)
+
+def _cached_reports(key, fingerprint_sql, query_sql, params=()):
+    """
+    Return the reports for a cache key, querying only when they have changed.
+    The cache keeps the REPORTS_CACHE_SIZE most recently used keys.
+    
+    Args:
+        key: user_id
+        fingerprint_sql (str): Query returning (COUNT(*), MAX(id)) for the reports
+        query_sql (str): Query returning the reports themselves
+        params (tuple): Parameters for both queries
+    
+    Returns:
+        list: List of reports as dictionaries
+    """
+    flush_writes()
+    conn = get_db_connection()
+    fingerprint = tuple(conn.execute(fingerprint_sql, params).fetchone())
+    with _reports_cache_lock:
+        cached = _reports_cache.get(key)
+        if cached is not None:
+            _reports_cache.move_to_end(key)
+    if cached is not None and cached[0] == fingerprint:
+        return cached[1]
+    
+    reports = [dict(row) for row in conn.execute(query_sql, params).fetchall()]
+    with _reports_cache_lock:
+        _reports_cache[key] = (fingerprint, reports)
+        _reports_cache.move_to_end(key)
+        # Evict the least recently used users' lists
+        while len(_reports_cache) > REPORTS_CACHE_SIZE:
+            _reports_cache.popitem(last=False)
+    return reports
+
+def _db_writer():
+    """
+    Background writer that drains the report queue.
+    Blocks for the first report, then keeps collecting for up to
+    WRITE_BATCH_TIMEOUT seconds (or WRITE_BATCH_SIZE reports) and inserts
+    the whole batch in a single transaction.
+    """
+    global _written_seq
+    while True:
+        batch = [_write_queue.get()]
+        deadline = time.monotonic() + WRITE_BATCH_TIMEOUT
+        while len(batch) < WRITE_BATCH_SIZE:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(_write_queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        
+        conn = None
+        try:
+            conn = get_db_connection()
+            conn.execute('BEGIN')
+            conn.executemany(INSERT_REPORT_SQL, [row for _, row in batch])
+            conn.commit()
+            _invalidate_reports(*{row[0] for _, row in batch})
+        except Exception as e:
+            if conn is not None and conn.in_transaction:
+                conn.rollback()
+            print(f"Error saving predictions: {e}")
+        finally:
+            # Reports leave the queue in sequence order, so the last one
+            # covers the whole batch, whether it was saved or not
+            with _write_done:
+                _written_seq = batch[-1][0]
+                _write_done.notify_all()
+
+def _start_writer():
+    """
+    Start the background writer unless it is already running.
+    Also restarts it in a forked process, where the thread does not survive.
+    """
+    global _writer
+    with _writer_lock:
+        if _writer is None or not _writer.is_alive():
+            _writer = threading.Thread(target=_db_writer, name='db-writer', daemon=True)
+            _writer.start()
+
+def _reset_after_fork():
+    """
+    Give a forked process its own writer queue and database connections;
+    neither the writer thread nor a SQLite connection survives a fork safely.
+    """
+    global _write_queue, _writer, _writer_lock, _reports_cache_lock, _local
+    global _queued_seq, _written_seq, _write_done
+    _write_queue = queue.Queue()
+    _writer = None
+    _writer_lock = threading.Lock()
+    _queued_seq = _written_seq = 0
+    _write_done = threading.Condition()
+    _reports_cache_lock = threading.Lock()
+    _local = threading.local()
+
+# Forking (gunicorn's pre-fork workers) only exists on Unix
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+def flush_writes():
+    """
+    Block until every report queued before this call has been written to
+    the database. Reports queued while waiting are not waited for.
+    """
+    with _write_done:
+        target = _queued_seq
+        _write_done.wait_for(lambda: _written_seq >= target)
+
 def save_prediction(user_id, username, input_data, prediction_result, probability):
     """
-    Save a prediction report to the database.
+    Queue a prediction report to be saved to the database.
+    The insert is done by a background writer, so this returns immediately.
     
     Args:
         user_id (int): User ID
@@ -134,19 +393,11 @@ def save_prediction(user_id, username, input_data, prediction_result, probabilit
         probability (float): Prediction probability/confidence score
     
     Returns:
-        bool: True if saved successfully
+        bool: True if queued successfully
     """
+    global _queued_seq
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO reports (
-                user_id, username, pregnancies, glucose, blood_pressure,
-                skin_thickness, insulin, bmi, diabetes_pedigree_function,
-                age, prediction_result, probability
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
+        row = (
             user_id,
             username,
             input_data['pregnancies'],
@@ -158,11 +409,14 @@ def save_prediction(user_id, username, input_data, prediction_result, probabilit
             input_data['diabetes_pedigree_function'],
             input_data['age'],
             prediction_result,
-            probability
-        ))
-        
-        conn.commit()
-        conn.close()
+            probability,
+            1 if prediction_result.startswith('Diabetes Detected') else 0
+        )
+        _start_writer()
+        # Numbered and queued under one lock so sequence numbers stay in queue order
+        with _write_done:
+            _queued_seq += 1
+            _write_queue.put((_queued_seq, row))
         return True
     except Exception as e:
         print(f"Error saving prediction: {e}")
@@ -177,44 +431,76 @@ def get_all_users():
     """
     conn = get_db_connection()
     users = conn.execute('SELECT * FROM users ORDER BY created_at DESC').fetchall()
-    conn.close()
     return users
 
-def get_all_reports():
+def get_reports_page(offset=0, limit=100):
     """
-    Get all prediction reports from the database.
+    Get one page of prediction reports, newest first.
+    
+    Args:
+        offset (int): Number of reports to skip
+        limit (int): Maximum number of reports to return
     
     Returns:
-        list: List of all reports with user information
+        list: List of report rows with user information
     """
+    flush_writes()
     conn = get_db_connection()
+    # Reports written in one batch share a second-resolution timestamp, so
+    # id breaks the ties (newest first) and keeps page boundaries stable
     reports = conn.execute('''
         SELECT r.*, u.username, u.email 
         FROM reports r 
         JOIN users u ON r.user_id = u.id 
-        ORDER BY r.timestamp DESC
-    ''').fetchall()
-    conn.close()
+        ORDER BY r.timestamp DESC, r.id DESC
+        LIMIT ? OFFSET ?
+    ''', (limit, offset)).fetchall()
     return reports
 
+def get_report_stats():
+    """
+    Get summary statistics for the admin dashboard in a single query.
+    
+    Returns:
+        dict: total_users, total_reports, diabetes_cases and normal_cases
+    """
+    flush_writes()
+    conn = get_db_connection()
+    row = conn.execute('''
+        SELECT
+            (SELECT COUNT(*) FROM users) AS total_users,
+            COUNT(*) AS total_reports,
+            COALESCE(SUM(is_diabetic), 0) AS diabetes_cases
+        FROM reports
+    ''').fetchone()
+    return {
+        'total_users': row['total_users'],
+        'total_reports': row['total_reports'],
+        'diabetes_cases': row['diabetes_cases'],
+        'normal_cases': row['total_reports'] - row['diabetes_cases']
+    }
+
 def get_user_reports(user_id):
     """
     Get all prediction reports for a specific user.
+    Results are cached per user until one of their reports is added or removed.
     
     Args:
         user_id (int): User ID
     
     Returns:
-        list: List of user's reports
+        list: List of user's reports (as dictionaries)
     """
-    conn = get_db_connection()
-    reports = conn.execute('''
-        SELECT * FROM reports 
-        WHERE user_id = ? 
-        ORDER BY timestamp DESC
-    ''', (user_id,)).fetchall()
-    conn.close()
-    return reports
+    return _cached_reports(
+        user_id,
+        'SELECT COUNT(*), MAX(id) FROM reports WHERE user_id = ?',
+        '''
+            SELECT * FROM reports 
+            WHERE user_id = ? 
+            ORDER BY timestamp DESC, id DESC
+        ''',
+        (user_id,)
+    )
 
 def delete_user(user_id):
     """
@@ -227,16 +513,23 @@ def delete_user(user_id):
         bool: True if deleted successfully
     """
     try:
+        # Let queued reports land first so none are inserted after the delete
+        flush_writes()
         conn = get_db_connection()
         cursor = conn.cursor()
         
-        # Delete user's reports first
-        cursor.execute('DELETE FROM reports WHERE user_id = ?', (user_id,))
-        # Delete user
-        cursor.execute('DELETE FROM users WHERE id = ?', (user_id,))
-        
-        conn.commit()
-        conn.close()
+        # Both deletes run in one transaction
+        cursor.execute('BEGIN')
+        try:
+            # Delete user's reports first
+            cursor.execute('DELETE FROM reports WHERE user_id = ?', (user_id,))
+            # Delete user
+            cursor.execute('DELETE FROM users WHERE id = ?', (user_id,))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        _invalidate_reports(user_id)
         return True
     except Exception as e:
         print(f"Error deleting user: {e}")
@@ -255,9 +548,12 @@ def delete_report(report_id):
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
+        
+        # Look up the owner so their cached history can be dropped
+        report = cursor.execute('SELECT user_id FROM reports WHERE id = ?', (report_id,)).fetchone()
         cursor.execute('DELETE FROM reports WHERE id = ?', (report_id,))
-        conn.commit()
-        conn.close()
+        if report:
+            _invalidate_reports(report['user_id'])
         return True
     except Exception as e:
         print(f"Error deleting report: {e}")
@@ -0,0 +1,221 @@
+"""
+Compiled Inference Module
+This module packs a trained Random Forest into flat NumPy node arrays and scores it
+with a Numba-compiled tree traversal, avoiding sklearn's per-tree Python dispatch
+on the small batches served by the web application. A Logistic Regression model
+is reduced to its weight vector and scored with a single dot product.
+
+The kernels are taken from the ahead-of-time compiled `_diabetes_fast` extension
+when it has been built (see build_aot.py), otherwise they are JIT-compiled with
+Numba, and without Numba the app falls back to plain NumPy and sklearn's
+leaf lookup.
+"""
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+# Marker sklearn uses for "no child" in tree_.children_left / children_right
+TREE_LEAF = -1
+
+def pack_forest(model):
+    """
+    Flatten a fitted binary random forest into one set of node arrays, with
+    the trees stored back to back and child indices made global.
+
+    Args:
+        model: Fitted classifier
+
+    Returns:
+        tuple: (roots, feature, threshold, children_left, children_right, value)
+        arrays, where roots holds each tree's first node and value the class 1
+        probability of each node, or None if the model is not a binary
+        sklearn RandomForestClassifier
+    """
+    # Only stock sklearn forests: patched ones (e.g. sklearnex's oneDAL forest)
+    # expose sklearn trees in estimators_ but predict with their own engine
+    if type(model) is not RandomForestClassifier:
+        return None
+    estimators = model.estimators_
+    if not estimators:
+        return None
+    if len(getattr(model, 'classes_', ())) != 2:
+        return None
+    if not all(hasattr(estimator, 'tree_') for estimator in estimators):
+        return None
+
+    trees = [estimator.tree_ for estimator in estimators]
+    node_counts = np.array([tree.node_count for tree in trees])
+    roots = np.zeros(len(trees), dtype=np.int32)
+    roots[1:] = np.cumsum(node_counts[:-1])
+    n_nodes = int(node_counts.sum())
+
+    feature = np.empty(n_nodes, dtype=np.int32)
+    threshold = np.empty(n_nodes, dtype=np.float64)
+    children_left = np.empty(n_nodes, dtype=np.int32)
+    children_right = np.empty(n_nodes, dtype=np.int32)
+    value = np.empty(n_nodes, dtype=np.float64)
+
+    for root, tree in zip(roots, trees):
+        nodes = slice(root, root + tree.node_count)
+        feature[nodes] = tree.feature
+        threshold[nodes] = tree.threshold
+        # Shift child indices past the preceding trees; leaves keep TREE_LEAF
+        children_left[nodes] = np.where(tree.children_left == TREE_LEAF, TREE_LEAF,
+                                        tree.children_left + root)
+        children_right[nodes] = np.where(tree.children_right == TREE_LEAF, TREE_LEAF,
+                                         tree.children_right + root)
+        # Normalize leaf class counts to per-tree probabilities, as predict_proba does
+        counts = tree.value[:, 0, :]
+        value[nodes] = counts[:, 1] / counts.sum(axis=1)
+
+    return roots, feature, threshold, children_left, children_right, value
+
+def pack_linear(model):
+    """
+    Extract the weights of a fitted binary logistic regression.
+
+    Args:
+        model: Fitted classifier
+
+    Returns:
+        tuple: (weights, intercept) as a float64 vector and a float,
+        or None if the model is not a binary one-vs-rest LogisticRegression
+    """
+    if not isinstance(model, LogisticRegression):
+        return None
+    if len(getattr(model, 'classes_', ())) != 2:
+        return None
+    # A multinomial fit scores binary problems as softmax([-z, z]), i.e.
+    # sigmoid(2z); only one-vs-rest is the plain sigmoid used here
+    # ('deprecated' is how newer sklearn spells the 'auto' default)
+    multi_class = getattr(model, 'multi_class', 'auto')
+    if model.solver != 'liblinear' and multi_class not in ('auto', 'ovr', 'deprecated'):
+        return None
+    return np.ascontiguousarray(model.coef_[0], dtype=np.float64), float(model.intercept_[0])
+
+def _forest_proba(X, roots, feature, threshold, children_left, children_right, value):
+    """
+    Average the class 1 leaf probabilities reached by each row of X in every tree.
+    Thresholds stay float64 so float32 inputs split exactly like sklearn's trees.
+    """
+    n_trees = roots.shape[0]
+    out = np.empty((X.shape[0], 2))
+    for i in range(X.shape[0]):
+        total = 0.0
+        for t in range(n_trees):
+            node = roots[t]
+            while children_left[node] != TREE_LEAF:
+                if X[i, feature[node]] <= threshold[node]:
+                    node = children_left[node]
+                else:
+                    node = children_right[node]
+            total += value[node]
+        out[i, 1] = total / n_trees
+        out[i, 0] = 1.0 - out[i, 1]
+    return out
+
+def _scale_rows(X, mean, scale, out):
+    """
+    Standardize the rows of X into the float32 buffer out: (X - mean) / scale.
+    The arithmetic is done in float64 and rounded once, as scaler.transform
+    followed by a float32 cast would, so tree splits see the same values.
+    """
+    for i in range(X.shape[0]):
+        for j in range(X.shape[1]):
+            out[i, j] = (X[i, j] - mean[j]) / scale[j]
+
+def _numpy_scale_rows(X, mean, scale, out):
+    """
+    NumPy version of _scale_rows, used when no compiled kernel is available.
+    """
+    np.divide(np.subtract(X, mean), scale, out=out)
+
+# Signatures for the ahead-of-time compiled kernels (used by build_aot.py)
+FOREST_PROBA_SIGNATURE = 'f8[:,:](f4[:,:], i4[:], i4[:], f8[:], i4[:], i4[:], f8[:])'
+SCALE_ROWS_SIGNATURE = 'void(f8[:,:], f8[:], f8[:], f4[:,:])'
+
+def _aot_kernels():
+    """
+    Import the ahead-of-time compiled kernels.
+
+    Returns:
+        tuple: (forest_proba, scale_rows), or None if the extension is not
+        built or was built from older kernel signatures
+    """
+    try:
+        from _diabetes_fast import forest_proba, scale_rows
+    except ImportError:
+        return None
+    # A stale build imports fine and only fails when called, so each kernel
+    # is probed once with tiny inputs of the current signatures
+    try:
+        leaf = np.full(1, TREE_LEAF, dtype=np.int32)
+        forest_proba(np.zeros((1, 1), dtype=np.float32), np.zeros(1, dtype=np.int32),
+                     np.zeros(1, dtype=np.int32), np.zeros(1), leaf, leaf, np.zeros(1))
+        scale_rows(np.zeros((1, 1)), np.zeros(1), np.ones(1), np.empty((1, 1), dtype=np.float32))
+    except TypeError:
+        print("⚠ _diabetes_fast is out of date, run 'python build_aot.py' to rebuild it")
+        return None
+    return forest_proba, scale_rows
+
+_kernels = _aot_kernels()
+if _kernels is not None:
+    forest_proba, scale_rows = _kernels
+elif njit is not None:
+    forest_proba = njit(cache=True)(_forest_proba)
+    scale_rows = njit(cache=True)(_scale_rows)
+else:
+    forest_proba = None
+    scale_rows = _numpy_scale_rows
+
+def make_predict_proba(model):
+    """
+    Build a predict_proba function for a model: a closed-form sigmoid for a
+    binary logistic regression, or for a binary random forest the compiled
+    traversal (or, without Numba, a gather over the leaves from model.apply).
+    The compiled function is warmed up here so the first request is not slow.
+
+    Args:
+        model: Fitted classifier
+
+    Returns:
+        callable: Function mapping a float32 (n_samples, n_features) array
+        to an (n_samples, 2) array of class probabilities
+    """
+    linear = pack_linear(model)
+    if linear is not None:
+        weights, intercept = linear
+
+        def predict_proba(X):
+            # sigmoid(X . w + b), stacked as [P(class 0), P(class 1)] like sklearn
+            p = 1.0 / (1.0 + np.exp(-(X @ weights + intercept)))
+            return np.column_stack((1.0 - p, p))
+
+        return predict_proba
+
+    packed = pack_forest(model)
+    if packed is None:
+        return model.predict_proba
+
+    if forest_proba is None:
+        roots, value = packed[0], packed[-1]
+
+        def predict_proba(X):
+            # model.apply gives each row's leaf in every tree; the forest
+            # average is then one gather and mean over the packed node values
+            p = value[roots + model.apply(X)].mean(axis=1)
+            return np.column_stack((1.0 - p, p))
+
+        return predict_proba
+
+    def predict_proba(X):
+        return forest_proba(X, *packed)
+
+    predict_proba(np.zeros((1, model.n_features_in_), dtype=np.float32))
+    return predict_proba
@@ -0,0 +1,24 @@
+"""
+Gunicorn Configuration
+Production server settings for the diabetes prediction application.
+The app (model, scaler and compiled kernels) is loaded once in the master
+process and shared copy-on-write by the forked workers; each worker runs
+several threads so requests can overlap database IO and inference.
+
+Usage:
+    gunicorn -c gunicorn.conf.py wsgi:app
+"""
+
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+
+# Load the application before forking workers
+preload_app = True
+
+workers = int(os.environ.get('WEB_CONCURRENCY', os.cpu_count() or 1))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
+
+# Keep the worker heartbeat files in memory rather than on disk
+worker_tmp_dir = '/dev/shm'
@@ -1,80 +1,199 @@
 """
 Machine Learning Model Training Script
-This script trains and evaluates Logistic Regression and Random Forest models
-for diabetes prediction using the Pima Indians Diabetes Dataset.
+This script trains and evaluates Logistic Regression, Random Forest and
+Histogram Gradient Boosting models for diabetes prediction using the Pima Indians Diabetes Dataset.
 """
 
 # Import necessary libraries
+import argparse
+import hashlib
+import io
+import os
 import pandas as pd
 import numpy as np
-import pickle
-from sklearn.model_selection import train_test_split
+import joblib
 from sklearn.preprocessing import StandardScaler
 from sklearn.linear_model import LogisticRegression
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, roc_auc_score
+from sklearn.ensemble import RandomForestClassifier, HistGradientBoostingClassifier
+from scipy.stats import rankdata
+from threadpoolctl import threadpool_limits
+
+parser = argparse.ArgumentParser(description='Train and compare the diabetes prediction models.')
+parser.add_argument('--no-cache', action='store_true',
+                    help='ignore the cached preprocessed arrays and rebuild them from diabetes.csv')
+parser.add_argument('--verbose', action='store_true',
+                    help='print the raw data and per-column imputation report when parsing diabetes.csv')
+args = parser.parse_args()
+
+CACHE_VERSION = 2
+
+# OpenMP threads for the histogram boosting fit; with ~500 training rows
+# more threads spend longer synchronizing than splitting
+OPENMP_THREADS = min(4, os.cpu_count() or 1)
+
+def preprocess(csv_bytes, verbose=False):
+    """
+    Parse the raw CSV, report on it and impute the zero placeholders.
+
+    Args:
+        csv_bytes (bytes): Contents of diabetes.csv
+        verbose (bool): Also print the pandas head/info/describe report and
+            the per-column imputation counts and medians
+
+    Returns:
+        tuple: (X, y, feature_names) with X a contiguous float64 array
+    """
+    # The file is fully numeric, so np.loadtxt parses it straight into one
+    # float64 array without building a DataFrame; only the header is text
+    columns = csv_bytes.split(b'\n', 1)[0].decode().strip().split(',')
+    data = np.loadtxt(io.BytesIO(csv_bytes), delimiter=',', skiprows=1, dtype=np.float64, ndmin=2)
+    print(f"Dataset loaded successfully! Shape: {data.shape}")
+
+    if verbose:
+        df = pd.DataFrame(data, columns=columns)
+        print("\nFirst few rows of the dataset:")
+        print(df.head())
+
+        # Display basic information about the dataset
+        print("\n" + "="*60)
+        print("Dataset Information:")
+        print("="*60)
+        print(df.info())
+        print("\nDataset Statistics:")
+        print(df.describe())
+
+        # Check for missing values
+        print("\n" + "="*60)
+        print("Missing Values Check:")
+        print("="*60)
+        print(df.isnull().sum())
+
+    # Handle missing values (zeros in some columns represent missing values)
+    # Columns where 0 is not a valid value
+    columns_with_zeros = ['Glucose', 'BloodPressure', 'SkinThickness', 'Insulin', 'BMI']
+    zero_cols = [columns.index(col) for col in columns_with_zeros]
+
+    # Replace 0 with NaN for specific columns in one vectorized pass
+    values = data[:, zero_cols]
+    zeros_mask = values == 0
+    values[zeros_mask] = np.nan
+
+    # Fill NaN with median values (computed once per column, reused for the report)
+    medians = np.nanmedian(values, axis=0)
+    data[:, zero_cols] = np.where(zeros_mask, medians, values)
+
+    if verbose:
+        print("\n" + "="*60)
+        print("Handling Missing Values (zeros):")
+        print("="*60)
+        for col, zero_count in zip(columns_with_zeros, zeros_mask.sum(axis=0)):
+            print(f"{col}: {zero_count} zero values found")
+        for col, median in zip(columns_with_zeros, medians):
+            print(f"{col}: Filled with median value {median:.2f}")
+    else:
+        print(f"Imputed {zeros_mask.sum()} zero placeholders with column medians "
+              f"(use --verbose for the per-column report)")
+
+    # Separate features and target variable
+    # Sliced into contiguous NumPy arrays once so sklearn does not copy them
+    # on every fit/transform
+    outcome = columns.index('Outcome')
+    feature_names = [col for col in columns if col != 'Outcome']
+    X = np.ascontiguousarray(np.delete(data, outcome, axis=1))  # Features
+    y = data[:, outcome].astype(np.int8)  # Target variable (0 = No Diabetes, 1 = Diabetes)
+
+    return X, y, feature_names
+
+def stratified_split(y, test_size=0.3, seed=42):
+    """
+    Shuffle each class separately and hold out test_size of it, so both
+    sets keep the class balance of y.
+
+    Args:
+        y (numpy.ndarray): Class labels
+        test_size (float): Fraction of each class to put in the test set
+        seed (int): Seed for the shuffle
+
+    Returns:
+        tuple: (train_idx, test_idx) sorted int64 row indices
+    """
+    rng = np.random.default_rng(seed)
+    train_parts, test_parts = [], []
+    for label in np.unique(y):
+        idx = np.flatnonzero(y == label)
+        rng.shuffle(idx)
+        n_test = int(round(test_size * len(idx)))
+        test_parts.append(idx[:n_test])
+        train_parts.append(idx[n_test:])
+    return np.sort(np.concatenate(train_parts)), np.sort(np.concatenate(test_parts))
+
+def classification_metrics(y_true, y_pred, y_proba):
+    """
+    Compute accuracy, precision, recall, F1 and ROC-AUC from one confusion
+    matrix and one ranking, instead of re-scanning the labels per metric.
+
+    Args:
+        y_true (numpy.ndarray): True 0/1 labels
+        y_pred (numpy.ndarray): Predicted 0/1 labels
+        y_proba (numpy.ndarray): Predicted probability of class 1
+
+    Returns:
+        tuple: (accuracy, precision, recall, f1, roc_auc); precision, recall
+        and F1 are 0.0 when undefined, as in sklearn
+    """
+    y_true = y_true.astype(np.intp)
+    # Cells 0..3 of the flattened 2x2 confusion matrix: tn, fp, fn, tp
+    tn, fp, fn, tp = np.bincount(2 * y_true + y_pred.astype(np.intp), minlength=4)
+    accuracy = (tp + tn) / len(y_true)
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = tp / (tp + fn) if tp + fn else 0.0
+    f1 = 2 * tp / (2 * tp + fp + fn) if tp else 0.0
+
+    # ROC-AUC as the Mann-Whitney U statistic (tied scores get average ranks)
+    n_pos = tp + fn
+    n_neg = len(y_true) - n_pos
+    pos_rank_sum = rankdata(y_proba)[y_true == 1].sum()
+    roc_auc = (pos_rank_sum - n_pos * (n_pos + 1) / 2) / (n_pos * n_neg)
+
+    return float(accuracy), float(precision), float(recall), float(f1), float(roc_auc)
 
 # Load the dataset
 print("Loading diabetes dataset...")
 try:
-    df = pd.read_csv('diabetes.csv')
-    print(f"Dataset loaded successfully! Shape: {df.shape}")
-    print("\nFirst few rows of the dataset:")
-    print(df.head())
+    with open('diabetes.csv', 'rb') as csv_file:
+        csv_bytes = csv_file.read()
 except FileNotFoundError:
     print("ERROR: diabetes.csv not found!")
     print("Please download the Pima Indians Diabetes Dataset and save it as 'diabetes.csv'")
     print("Dataset available at: https://www.kaggle.com/datasets/uciml/pima-indians-diabetes-database")
     exit()
 
-# Display basic information about the dataset
-print("\n" + "="*60)
-print("Dataset Information:")
-print("="*60)
-print(df.info())
-print("\nDataset Statistics:")
-print(df.describe())
-
-# Check for missing values
-print("\n" + "="*60)
-print("Missing Values Check:")
-print("="*60)
-print(df.isnull().sum())
-
-# Handle missing values (zeros in some columns represent missing values)
-# Columns where 0 is not a valid value
-columns_with_zeros = ['Glucose', 'BloodPressure', 'SkinThickness', 'Insulin', 'BMI']
-
-print("\n" + "="*60)
-print("Handling Missing Values (zeros):")
-print("="*60)
-
-# Replace 0 with NaN for specific columns
-for col in columns_with_zeros:
-    zero_count = (df[col] == 0).sum()
-    print(f"{col}: {zero_count} zero values found")
-    df[col] = df[col].replace(0, np.nan)
-
-# Fill NaN with median values
-for col in columns_with_zeros:
-    df[col] = df[col].fillna(df[col].median())
-    print(f"{col}: Filled with median value {df[col].median():.2f}")
-
-# Separate features and target variable
-X = df.drop('Outcome', axis=1)  # Features
-y = df['Outcome']  # Target variable (0 = No Diabetes, 1 = Diabetes)
+# Preprocessed arrays (and the fitted scaler parameters) are cached next to
+# the CSV, keyed by its content hash, so re-runs skip parsing and imputation
+# (bump CACHE_VERSION when the split changes, since the scaler depends on it)
+cache_path = f"cache_{hashlib.sha1(csv_bytes).hexdigest()[:12]}_v{CACHE_VERSION}.npz"
+cache = None
+if not args.no_cache and os.path.exists(cache_path):
+    cache = np.load(cache_path)
+    X, y = cache['X'], cache['y']
+    feature_names = cache['feature_names'].tolist()
+    print(f"Loaded preprocessed dataset from '{cache_path}'. Shape: {X.shape}")
+else:
+    X, y, feature_names = preprocess(csv_bytes, verbose=args.verbose)
 
 print("\n" + "="*60)
 print("Features and Target:")
 print("="*60)
-print(f"Features (X): {X.columns.tolist()}")
+print(f"Features (X): {feature_names}")
 print(f"Target (y): Outcome (0 = No Diabetes, 1 = Diabetes)")
 print(f"Total samples: {len(X)}")
 print(f"Diabetes cases: {y.sum()} ({y.sum()/len(y)*100:.2f}%)")
 print(f"Non-diabetes cases: {len(y)-y.sum()} ({(len(y)-y.sum())/len(y)*100:.2f}%)")
 
 # Split the data into training and testing sets (70% training, 30% testing)
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.3, random_state=42, stratify=y)
+train_idx, test_idx = stratified_split(y, test_size=0.3, seed=42)
+X_train, X_test = X[train_idx], X[test_idx]
+y_train, y_test = y[train_idx], y[test_idx]
 
 print("\n" + "="*60)
 print("Train-Test Split (70-30):")
@@ -84,8 +203,28 @@ print(f"Testing samples: {len(X_test)}")
 
 # Feature Scaling using StandardScaler
 scaler = StandardScaler()
-X_train_scaled = scaler.fit_transform(X_train)
-X_test_scaled = scaler.transform(X_test)
+if cache is not None:
+    # Restore the parameters fitted on this same split instead of refitting
+    scaler.mean_, scaler.var_, scaler.scale_ = cache['mean'], cache['var'], cache['scale']
+    scaler.n_features_in_ = X.shape[1]
+    scaler.n_samples_seen_ = len(X_train)
+else:
+    scaler.fit(X_train)
+    np.savez_compressed(cache_path, X=X, y=y, feature_names=np.array(feature_names),
+                        mean=scaler.mean_, var=scaler.var_, scale=scaler.scale_)
+
+# Scale train and test rows into one preallocated float32 buffer (train
+# rows first, so both sets are contiguous views). float32 is what the app
+# scores requests with, and halves the bytes moved through the LR gradient
+# and the forest's split scans. The arithmetic is done in float64 and
+# rounded once on the way into the buffer, exactly as the app's scaler and
+# fast_inference.scale_rows do, so training sees the same split values.
+n_train = len(X_train)
+X_scaled = np.empty(X.shape, dtype=np.float32)
+np.divide(X_train - scaler.mean_, scaler.scale_, out=X_scaled[:n_train])
+np.divide(X_test - scaler.mean_, scaler.scale_, out=X_scaled[n_train:])
+X_train_scaled, X_test_scaled = X_scaled[:n_train], X_scaled[n_train:]
+y_train = y_train.astype(np.int8)
 
 print("\n" + "="*60)
 print("Feature Scaling Applied (StandardScaler)")
@@ -99,20 +238,24 @@ print("TRAINING MODEL 1: LOGISTIC REGRESSION")
 print("="*60)
 
 # Initialize and train Logistic Regression model
-lr_model = LogisticRegression(random_state=42, max_iter=1000)
-lr_model.fit(X_train_scaled, y_train)
+# liblinear's coordinate descent is faster than LBFGS on a problem this small;
+# a large intercept_scaling keeps it from regularizing the intercept, so the
+# fit matches the LBFGS solution
+lr_model = LogisticRegression(random_state=42, max_iter=200, solver='liblinear', C=1.0,
+                              intercept_scaling=100)
+# A single BLAS thread: on ~540 rows of 8 features a thread pool costs more than the work
+with threadpool_limits(limits=1, user_api='blas'):
+    lr_model.fit(X_train_scaled, y_train)
 print("✓ Logistic Regression model trained successfully!")
 
-# Make predictions
-y_pred_lr = lr_model.predict(X_test_scaled)
+# Make predictions (one predict_proba call; class 1 when it is strictly more
+# likely, which is what predict's argmax picks)
 y_pred_proba_lr = lr_model.predict_proba(X_test_scaled)[:, 1]
+y_pred_lr = (y_pred_proba_lr > 0.5).astype(np.int8)
 
 # Evaluate Logistic Regression
-lr_accuracy = accuracy_score(y_test, y_pred_lr)
-lr_precision = precision_score(y_test, y_pred_lr)
-lr_recall = recall_score(y_test, y_pred_lr)
-lr_f1 = f1_score(y_test, y_pred_lr)
-lr_roc_auc = roc_auc_score(y_test, y_pred_proba_lr)
+lr_accuracy, lr_precision, lr_recall, lr_f1, lr_roc_auc = classification_metrics(
+    y_test, y_pred_lr, y_pred_proba_lr)
 
 print("\nLogistic Regression Results:")
 print(f"  • Accuracy:  {lr_accuracy:.4f} ({lr_accuracy*100:.2f}%)")
@@ -129,20 +272,18 @@ print("TRAINING MODEL 2: RANDOM FOREST CLASSIFIER")
 print("="*60)
 
 # Initialize and train Random Forest model
-rf_model = RandomForestClassifier(n_estimators=100, random_state=42, max_depth=10)
+rf_model = RandomForestClassifier(n_estimators=100, random_state=42, max_depth=10, n_jobs=-1)
 rf_model.fit(X_train_scaled, y_train)
 print("✓ Random Forest model trained successfully!")
 
-# Make predictions
-y_pred_rf = rf_model.predict(X_test_scaled)
+# Make predictions (one predict_proba call; class 1 when it is strictly more
+# likely, which is what predict's argmax picks)
 y_pred_proba_rf = rf_model.predict_proba(X_test_scaled)[:, 1]
+y_pred_rf = (y_pred_proba_rf > 0.5).astype(np.int8)
 
 # Evaluate Random Forest
-rf_accuracy = accuracy_score(y_test, y_pred_rf)
-rf_precision = precision_score(y_test, y_pred_rf)
-rf_recall = recall_score(y_test, y_pred_rf)
-rf_f1 = f1_score(y_test, y_pred_rf)
-rf_roc_auc = roc_auc_score(y_test, y_pred_proba_rf)
+rf_accuracy, rf_precision, rf_recall, rf_f1, rf_roc_auc = classification_metrics(
+    y_test, y_pred_rf, y_pred_proba_rf)
 
 print("\nRandom Forest Results:")
 print(f"  • Accuracy:  {rf_accuracy:.4f} ({rf_accuracy*100:.2f}%)")
@@ -151,6 +292,39 @@ print(f"  • Recall:    {rf_recall:.4f}")
 print(f"  • F1 Score:  {rf_f1:.4f}")
 print(f"  • ROC-AUC:   {rf_roc_auc:.4f}")
 
+# ============================================
+# Model 3: Histogram Gradient Boosting Classifier
+# ============================================
+print("\n" + "="*60)
+print("TRAINING MODEL 3: HISTOGRAM GRADIENT BOOSTING CLASSIFIER")
+print("="*60)
+
+# Initialize and train Histogram Gradient Boosting model
+# Features are binned into uint8 histograms, so each split scans far fewer
+# bytes than the forest. Trees are scale-invariant, but the model is still
+# trained on the scaled features because the app scales every input.
+hgb_model = HistGradientBoostingClassifier(max_iter=200, max_depth=6, learning_rate=0.05,
+                                           early_stopping=True, random_state=42)
+with threadpool_limits(limits=OPENMP_THREADS, user_api='openmp'):
+    hgb_model.fit(X_train_scaled, y_train)
+print("✓ Histogram Gradient Boosting model trained successfully!")
+
+# Make predictions (one predict_proba call; class 1 when it is strictly more
+# likely, which is what predict's argmax picks)
+y_pred_proba_hgb = hgb_model.predict_proba(X_test_scaled)[:, 1]
+y_pred_hgb = (y_pred_proba_hgb > 0.5).astype(np.int8)
+
+# Evaluate Histogram Gradient Boosting
+hgb_accuracy, hgb_precision, hgb_recall, hgb_f1, hgb_roc_auc = classification_metrics(
+    y_test, y_pred_hgb, y_pred_proba_hgb)
+
+print("\nHistogram Gradient Boosting Results:")
+print(f"  • Accuracy:  {hgb_accuracy:.4f} ({hgb_accuracy*100:.2f}%)")
+print(f"  • Precision: {hgb_precision:.4f}")
+print(f"  • Recall:    {hgb_recall:.4f}")
+print(f"  • F1 Score:  {hgb_f1:.4f}")
+print(f"  • ROC-AUC:   {hgb_roc_auc:.4f}")
+
 # ============================================
 # Model Comparison
 # ============================================
@@ -162,7 +336,8 @@ print("="*60)
 comparison_df = pd.DataFrame({
     'Metric': ['Accuracy', 'Precision', 'Recall', 'F1 Score', 'ROC-AUC'],
     'Logistic Regression': [lr_accuracy, lr_precision, lr_recall, lr_f1, lr_roc_auc],
-    'Random Forest': [rf_accuracy, rf_precision, rf_recall, rf_f1, rf_roc_auc]
+    'Random Forest': [rf_accuracy, rf_precision, rf_recall, rf_f1, rf_roc_auc],
+    'Hist Gradient Boosting': [hgb_accuracy, hgb_precision, hgb_recall, hgb_f1, hgb_roc_auc]
 })
 
 print(comparison_df.to_string(index=False))
@@ -172,7 +347,11 @@ print("\n" + "="*60)
 print("SELECTING BEST MODEL")
 print("="*60)
 
-if rf_accuracy > lr_accuracy:
+if hgb_accuracy > max(rf_accuracy, lr_accuracy):
+    best_model = hgb_model
+    best_model_name = "Hist Gradient Boosting"
+    best_accuracy = hgb_accuracy
+elif rf_accuracy > lr_accuracy:
     best_model = rf_model
     best_model_name = "Random Forest"
     best_accuracy = rf_accuracy
@@ -192,23 +371,30 @@ print("SAVING MODEL AND SCALER")
 print("="*60)
 
 # Save the best model
-with open('model.pkl', 'wb') as model_file:
-    pickle.dump(best_model, model_file)
+# The app scores one request (or a small batch) at a time, where spreading
+# the trees over a worker pool costs more than it saves
+if hasattr(best_model, 'n_jobs'):
+    best_model.set_params(n_jobs=None)
+# joblib stores the trees' NumPy arrays as raw blocks; compress=3 keeps the
+# file small
+joblib.dump(best_model, 'model.pkl', compress=3)
 print("✓ Best model saved as 'model.pkl'")
+# Uncompressed copy the app memory-maps (what convert_model.py writes),
+# rewritten here so it never lags behind model.pkl and scaler.pkl
+joblib.dump(best_model, 'model.joblib', compress=0)
+print("✓ Memory-mappable copy saved as 'model.joblib'")
 
 # Save the scaler
-with open('scaler.pkl', 'wb') as scaler_file:
-    pickle.dump(scaler, scaler_file)
+joblib.dump(scaler, 'scaler.pkl', compress=3)
 print("✓ Scaler saved as 'scaler.pkl'")
 
 # Save model metadata
 metadata = {
     'model_name': best_model_name,
     'accuracy': best_accuracy,
-    'features': X.columns.tolist()
+    'features': feature_names
 }
-with open('model_metadata.pkl', 'wb') as meta_file:
-    pickle.dump(metadata, meta_file)
+joblib.dump(metadata, 'model_metadata.pkl')
 print("✓ Model metadata saved as 'model_metadata.pkl'")
 
 print("\n" + "="*60)
@@ -1,32 +1,37 @@
-import pickle
+import joblib
 import numpy as np
+from fast_inference import make_predict_proba, scale_rows
 
 # Load model and scaler
-with open('model.pkl', 'rb') as f:
-    model = pickle.load(f)
-with open('scaler.pkl', 'rb') as f:
-    scaler = pickle.load(f)
+model = joblib.load('model.pkl')
+scaler = joblib.load('scaler.pkl')
+predict_proba = make_predict_proba(model)
+
+# Scaler parameters for the compiled transform, which writes float32 rows
+mean_ = np.ascontiguousarray(scaler.mean_, dtype=np.float64)
+scale_ = np.ascontiguousarray(scaler.scale_, dtype=np.float64)
 
 print("Testing with adjusted threshold (0.45)...")
 print("="*60)
 
+# Both test cases are scored in one batch:
 # Test Case 1 - Should be Likely Diabetes
-test1 = np.array([[6, 148, 72, 35, 80, 33.6, 0.627, 50]])
-test1_scaled = scaler.transform(test1)
-proba1 = model.predict_proba(test1_scaled)[0]
-pred1 = 1 if proba1[1] >= 0.45 else 0
+# Test Case 2 - Should be Unlikely Diabetes
+tests = np.array([
+    [6, 148, 72, 35, 80, 33.6, 0.627, 50],
+    [1, 85, 66, 29, 0, 26.6, 0.351, 31],
+], dtype=np.float64)
+tests_scaled = np.empty(tests.shape, dtype=np.float32)
+scale_rows(tests, mean_, scale_, tests_scaled)
+probas = predict_proba(tests_scaled)
+preds = (probas[:, 1] >= 0.45).astype(np.int8)
+(pred1, pred2), (proba1, proba2) = preds, probas
 
 print("\nTest Case 1 (Should be POSITIVE):")
 print(f"Input: Pregnancies=6, Glucose=148, BP=72, Skin=35, Insulin=80, BMI=33.6, Pedigree=0.627, Age=50")
 print(f"Raw probabilities: No Diabetes={proba1[0]:.4f} ({proba1[0]*100:.2f}%), Has Diabetes={proba1[1]:.4f} ({proba1[1]*100:.2f}%)")
 print(f"Prediction with threshold 0.45: {pred1} ({'✓ POSITIVE' if pred1 == 1 else '✗ NEGATIVE'})")
 
-# Test Case 2 - Should be Unlikely Diabetes
-test2 = np.array([[1, 85, 66, 29, 0, 26.6, 0.351, 31]])
-test2_scaled = scaler.transform(test2)
-proba2 = model.predict_proba(test2_scaled)[0]
-pred2 = 1 if proba2[1] >= 0.45 else 0
-
 print("\n" + "="*60)
 print("\nTest Case 2 (Should be NEGATIVE):")
 print(f"Input: Pregnancies=1, Glucose=85, BP=66, Skin=29, Insulin=0, BMI=26.6, Pedigree=0.351, Age=31")
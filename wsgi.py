@@ -0,0 +1,8 @@
+"""
+WSGI Entry Point
+Exposes the Flask application for production WSGI servers:
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+"""
+
+from app import app